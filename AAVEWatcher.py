@@ -1,18 +1,21 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from web3 import Web3
+from web3 import Web3, AsyncWeb3, AsyncHTTPProvider, WebSocketProvider
+from websockets.exceptions import ConnectionClosed
 from datetime import datetime, UTC
-from web3.exceptions import ContractLogicError
-from eth_abi import decode
+from eth_abi import decode, encode
 from functools import lru_cache
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
-import os, time, math, logging
+import os, logging, asyncio, threading
+import json
+import struct
 import traceback
-
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+from pathlib import Path
 
 # -------------------------
 # Config & setup
@@ -22,8 +25,9 @@ ALCHEMY_API = os.getenv("ALCHEMY_API")
 BOT_TOKEN   = os.getenv("BOT_TOKEN")
 CHAT_ID     = os.getenv("CHAT_ID")
 
-ALCHEMY_URL = f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API}"
-w3 = Web3(Web3.HTTPProvider(ALCHEMY_URL, request_kwargs={"timeout": 30}))
+ALCHEMY_URL     = f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API}"
+ALCHEMY_WSS_URL = f"wss://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API}"
+w3 = AsyncWeb3(AsyncHTTPProvider(ALCHEMY_URL, request_kwargs={"timeout": aiohttp.ClientTimeout(total=30)}))
 
 # PoolConfigurator (proxy) on ETH mainnet
 CONFIGURATOR = Web3.to_checksum_address("0x64b761D848206f447Fe2dd461b0c635Ec39EbB27")
@@ -32,28 +36,45 @@ CONFIGURATOR = Web3.to_checksum_address("0x64b761D848206f447Fe2dd461b0c635Ec39Eb
 log = logging.getLogger("aave_watcher")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
 
-# Event topic0 hashes
-TOPIC_SUPPLY_CAP_CHANGED = Web3.keccak(text="SupplyCapChanged(address,uint256,uint256)").hex()
-TOPIC_BORROW_CAP_CHANGED = Web3.keccak(text="BorrowCapChanged(address,uint256,uint256)").hex()
+# Event topic0 hashes: raw bytes for comparing against log topics, hex for filters/logging
+TOPIC_SUPPLY_CAP_BYTES   = Web3.keccak(text="SupplyCapChanged(address,uint256,uint256)")
+TOPIC_BORROW_CAP_BYTES   = Web3.keccak(text="BorrowCapChanged(address,uint256,uint256)")
+TOPIC_SUPPLY_CAP_CHANGED = TOPIC_SUPPLY_CAP_BYTES.to_0x_hex()  # hexbytes>=1: .hex() has no 0x prefix
+TOPIC_BORROW_CAP_CHANGED = TOPIC_BORROW_CAP_BYTES.to_0x_hex()
 #TOPIC_DEBT_CEIL_CHANGED = Web3.keccak(text="DebtCeilingChanged(address,uint256,uint256)").hex()
 WATCH_TOPICS = [[TOPIC_SUPPLY_CAP_CHANGED, TOPIC_BORROW_CAP_CHANGED]]
 
 # Watcher parameters
-MAX_BLOCK_SPAN   = 10    # Respect Alchemy free plan window (<= 10 blocks)
+MIN_BLOCK_SPAN   = 10      # Alchemy free plan window (<= 10 blocks)
+MAX_BLOCK_SPAN   = 50_000  # Upper bound for adaptive get_logs windows
+SPAN_GROW_AFTER  = 10      # Full-size windows in a row before the span doubles
+SPAN_GROW_MAX_LOGS = 500   # ...and only if each returned fewer logs than this
 CONFIRMATIONS    = 3     # Safety against reorgs
 POLL_SECONDS     = 5     # Sleep between polls when caught up
 START_BLOCK_ENV  = os.getenv("AAVE_START_BLOCK")  # optional manual start
+USE_WS           = os.getenv("USE_WS", "").lower() in ("1", "true", "yes")  # eth_subscribe push instead of polling
+
+# Adaptive get_logs window (halved on "range too large" errors, doubled on sustained success)
+current_span = min(MAX_BLOCK_SPAN, max(MIN_BLOCK_SPAN, int(os.getenv("AAVE_BLOCK_SPAN", 2000))))
+_span_streak = 0
 
 # -------------------------
 # Alerting (Telegram)
 # -------------------------
+# Shared keep-alive HTTP session: reuses TCP/TLS connections across polls
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
+
 def notify(msg: str):
     if not (BOT_TOKEN and CHAT_ID):
         log.info(msg)
         print("[WARN][NO-TELEGRAM]", msg)
         return
     try:
-        requests.post(
+        _session.post(
             f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
             data={"chat_id": CHAT_ID, "text": msg},
             timeout=10,
@@ -67,14 +88,59 @@ def notify(msg: str):
 SEL_SYMBOL = Web3.keccak(text="symbol()")[:4]  # 0x95d89b41 (first 4 bytes)
 SEL_NAME   = Web3.keccak(text="name()")[:4]    # 0x06fdde03
 
-def _call_fn(to_addr: str, selector: bytes) -> bytes | None:
-    """Raw eth_call helper. Returns return-data bytes or None on error/empty."""
+# Multicall3 (same address on every EVM chain)
+MULTICALL3     = Web3.to_checksum_address("0xcA11bde05977b3631167028862bE2a173976CA11")
+SEL_AGGREGATE3 = Web3.keccak(text="aggregate3((address,bool,bytes)[])")[:4]  # 0x82ad56cb
+
+# checksummed address -> label; plain dict so a whole batch can be filled at once.
+# Symbols are effectively immutable, so the cache is persisted across restarts.
+BASE_DIR       = Path(__file__).resolve().parent
+LABEL_CACHE_FP = Path(os.getenv("AAVE_LABEL_CACHE_FP", BASE_DIR / "aave_token_labels.json"))
+_label_cache: dict[str, str] = {}
+_label_cache_dirty = False
+
+def load_label_cache():
+    """Seed _label_cache from LABEL_CACHE_FP (missing/corrupt file → start empty)."""
     try:
-        data = "0x" + selector.hex()
-        out  = w3.eth.call({"to": Web3.to_checksum_address(to_addr), "data": data})
-        return bytes(out) if out is not None else None
-    except Exception:
-        return None
+        with open(LABEL_CACHE_FP, encoding="utf-8") as f:
+            _label_cache.update(json.load(f))
+        log.info("Loaded %s token labels from %s", len(_label_cache), LABEL_CACHE_FP)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.warning("[WARN] Could not load token label cache: %s", e)
+
+def save_label_cache():
+    """Write _label_cache to disk if new labels were added (tmp + replace, never half-written)."""
+    global _label_cache_dirty
+    if not _label_cache_dirty:
+        return
+    try:
+        tmp = LABEL_CACHE_FP.with_suffix(LABEL_CACHE_FP.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_label_cache, f, ensure_ascii=False, indent=2, sort_keys=True)
+        tmp.replace(LABEL_CACHE_FP)
+        _label_cache_dirty = False
+    except Exception as e:
+        log.warning("[WARN] Could not save token label cache: %s", e)
+
+@lru_cache(maxsize=8192)
+def _cksum(addr_lower: str) -> str:
+    """EIP-55 checksum (one keccak) per unique lowercased address, memoized."""
+    return Web3.to_checksum_address(addr_lower)
+
+async def _multicall3(calls: list[tuple[str, bytes]]) -> list[bytes | None]:
+    """
+    Single eth_call to Multicall3.aggregate3 with allowFailure=True for every call.
+    Returns the return-data bytes per call (None where the sub-call reverted).
+    """
+    calldata = bytes(SEL_AGGREGATE3) + encode(
+        ["(address,bool,bytes)[]"],
+        [[(to, True, bytes(data)) for to, data in calls]],
+    )
+    out = await w3.eth.call({"to": MULTICALL3, "data": "0x" + calldata.hex()})
+    (results,) = decode(["(bool,bytes)[]"], bytes(out))
+    return [bytes(ret) if ok else None for ok, ret in results]
 
 def _decode_string_or_bytes32(ret: bytes) -> str | None:
     """Try decode dynamic string; if not, try bytes32 -> str."""
@@ -94,79 +160,121 @@ def _decode_string_or_bytes32(ret: bytes) -> str | None:
     except Exception:
         return None
 
-@lru_cache(maxsize=4096)
-def resolve_token_label(addr: str) -> str:
-    """Best-effort token label: symbol -> name -> address."""
-    if not addr:
-        return ""
-    ca = Web3.to_checksum_address(addr)
+async def prefetch_token_labels(addrs) -> None:
+    """
+    Fill _label_cache for every not-yet-known address with ONE Multicall3 call
+    bundling symbol() and name() per token. Label: symbol -> name -> address.
+    """
+    global _label_cache_dirty
+    unknown = sorted({_cksum(a.lower()) for a in addrs if a} - _label_cache.keys())
+    if not unknown:
+        return
 
-    # Ensure it's a contract
+    calls = []
+    for ca in unknown:
+        calls.append((ca, SEL_SYMBOL))
+        calls.append((ca, SEL_NAME))
     try:
-        if not w3.eth.get_code(ca):
-            return ca
-    except Exception:
-        return ca
+        rets = await _multicall3(calls)
+    except Exception as e:
+        log.warning("[WARN] Multicall3 label lookup failed for %s assets: %s", len(unknown), e)
+        return
 
-    # symbol()
-    ret = _call_fn(ca, SEL_SYMBOL)
-    sym = _decode_string_or_bytes32(ret) if ret is not None else None
-    if sym:
-        return sym
+    for i, ca in enumerate(unknown):
+        sym = _decode_string_or_bytes32(rets[2 * i])
+        nm  = _decode_string_or_bytes32(rets[2 * i + 1])
+        _label_cache[ca] = sym or nm or ca
+    _label_cache_dirty = True
 
-    # name()
-    ret = _call_fn(ca, SEL_NAME)
-    nm  = _decode_string_or_bytes32(ret) if ret is not None else None
-    if nm:
-        return nm
+async def resolve_token_label(addr: str) -> str:
+    """Best-effort token label: symbol -> name -> address (served from _label_cache)."""
+    if not addr:
+        return ""
+    ca = _cksum(addr.lower())
+    if ca not in _label_cache:
+        await prefetch_token_labels([ca])
+    return _label_cache.get(ca, ca)
 
-    return ca
+# -------------------------
+# Block timestamps (batched)
+# -------------------------
+BLOCK_TS_CACHE_SIZE = 4096
+_block_ts_cache: dict[int, datetime] = {}  # insertion-ordered → oldest evicted first
+
+async def get_block_timestamps(block_numbers) -> dict[int, datetime]:
+    """
+    Timestamps for block_numbers. Blocks not cached yet are fetched in ONE
+    JSON-RPC batch (instead of one get_block round trip per log).
+    """
+    wanted  = set(block_numbers)
+    missing = sorted(bn for bn in wanted if bn not in _block_ts_cache)
+    if missing:
+        async with w3.batch_requests() as batch:
+            for bn in missing:
+                batch.add(w3.eth.get_block(bn))
+            blocks = await batch.async_execute()
+        for blk in blocks:
+            _block_ts_cache[blk.number] = datetime.fromtimestamp(blk.timestamp, UTC)
+
+    ts_by_block = {bn: _block_ts_cache[bn] for bn in wanted}
+    while len(_block_ts_cache) > BLOCK_TS_CACHE_SIZE:
+        del _block_ts_cache[next(iter(_block_ts_cache))]
+    return ts_by_block
 
 # -------------------------
 # Log decoding
 # -------------------------
-def decode_cap_change_log(log) -> dict:
+# data = oldCap | newCap: two uint256 words unpacked as 8 big-endian uint64 limbs in one C call
+_U256_PAIR = struct.Struct(">8Q")
+
+def log_asset_addr(log) -> str:
+    """Indexed asset address (topic[1]) of a cap-change log."""
+    return "0x" + bytes(log["topics"][1][-20:]).hex()
+
+async def decode_cap_change_log(log, ts_by_block: dict[int, datetime]) -> dict:
     """
     Decodes either SupplyCapChanged or BorrowCapChanged.
+    ts_by_block maps blockNumber -> timestamp (see get_block_timestamps).
     Returns a dict with fields: event, block, tx, asset_addr, asset_label, old_cap, new_cap, ts.
     """
-    topic0 = log["topics"][0].hex() if hasattr(log["topics"][0], "hex") else str(log["topics"][0])
-    if topic0 == TOPIC_SUPPLY_CAP_CHANGED:
+    topic0 = log["topics"][0]  # HexBytes → plain 32-byte compare, no hex encoding
+    if topic0 == TOPIC_SUPPLY_CAP_BYTES:
         event = "SupplyCapChanged"
-    elif topic0 == TOPIC_BORROW_CAP_CHANGED:
+    elif topic0 == TOPIC_BORROW_CAP_BYTES:
         event = "BorrowCapChanged"
 #    elif topic0 == TOPIC_DEBT_CEIL_CHANGED:
 #        event = "DebtCeilingChanged"
     else:
         event = "UnknownEvent"
 
-    # indexed address (topic[1]) = asset
-    asset_addr = "0x" + log["topics"][1].hex()[-40:]
-    asset_label = resolve_token_label(asset_addr)
+    asset_addr = log_asset_addr(log)
+    asset_label = await resolve_token_label(asset_addr)
 
-    # data: oldCap, newCap
-    data_hex = log["data"].hex() if isinstance(log["data"], (bytes, bytearray)) else str(log["data"])
-    if data_hex.startswith("0x"):
-        data_hex = data_hex[2:]
-    old_cap, new_cap = decode(["uint256", "uint256"], bytes.fromhex(data_hex))
+    # data: oldCap, newCap — two fixed uint256 words (no ABI decoder); caps almost
+    # always fit in the low limb, so the shifts only run when the upper limbs are set
+    data = log["data"]
+    if not isinstance(data, (bytes, bytearray)):
+        data = bytes.fromhex(str(data).removeprefix("0x"))
+    o0, o1, o2, o3, n0, n1, n2, n3 = _U256_PAIR.unpack_from(data, 0)
+    old_cap = (o0 << 192 | o1 << 128 | o2 << 64 | o3) if (o0 | o1 | o2) else o3
+    new_cap = (n0 << 192 | n1 << 128 | n2 << 64 | n3) if (n0 | n1 | n2) else n3
 
     # timestamp
     bn = log["blockNumber"]
-    blk = w3.eth.get_block(bn)
-    ts  = datetime.fromtimestamp(blk.timestamp, UTC)
+    ts = ts_by_block[bn]
 
     return {
         "event": event,
         "block": bn,
-        "tx": log["transactionHash"].hex(),
+        "tx": log["transactionHash"].to_0x_hex(),
         "asset_addr": asset_addr,
         "asset_label": asset_label,
-        "old_cap": int(old_cap),
-        "new_cap": int(new_cap),
+        "old_cap": old_cap,
+        "new_cap": new_cap,
         "ts": ts,
     }
 
-def emit_event_msg(ev: dict):
+async def emit_event_msg(ev: dict):
     msg = (
         f"🔥 {ev['ts']:%Y-%m-%d %H:%M:%S %Z} | Block {ev['block']} | "
         f"{ev['event']} | Asset {ev['asset_label']} | "
@@ -174,40 +282,102 @@ def emit_event_msg(ev: dict):
     )
     log.info(msg)
     print(msg)
-    notify(msg)
+    await asyncio.to_thread(notify, msg)  # blocking requests POST → keep the loop free
 
 # -------------------------
 # Fetch & process
 # -------------------------
-def fetch_and_process(from_block: int, to_block: int) -> int:
+# Provider error fragments meaning "ask for fewer blocks" (Alchemy + common node wording)
+RANGE_ERROR_HINTS = ("log response size exceeded", "block range", "query returned more than")
+
+def _is_range_error(e: Exception) -> bool:
+    msg = str(e).lower()
+    return any(h in msg for h in RANGE_ERROR_HINTS)
+
+async def get_logs_adaptive(from_block: int, to_block: int) -> list:
     """
-    Fetch logs in [from_block, to_block] for both cap-change events and process them.
-    Returns number of logs processed.
+    get_logs for [from_block, to_block]; on a range/size error, halve current_span
+    and bisect the window recursively. Doubles current_span after SPAN_GROW_AFTER
+    full-size windows in a row that each stayed under SPAN_GROW_MAX_LOGS logs.
     """
-    if to_block < from_block:
-        return 0
+    global current_span, _span_streak
 
     # topics filter: OR on topic0 → pass as list in the first element
     # topics_filter = [[TOPIC_SUPPLY_CAP_CHANGED, TOPIC_BORROW_CAP_CHANGED,TOPIC_DEBT_CEIL_CHANGED]]
     topics_filter = [[TOPIC_SUPPLY_CAP_CHANGED, TOPIC_BORROW_CAP_CHANGED]]
 
-    logs = w3.eth.get_logs({
-        "address": CONFIGURATOR,
-        "fromBlock": from_block,
-        "toBlock": to_block,
-        "topics": topics_filter,
-    })
+    span = to_block - from_block + 1
+    try:
+        logs = await w3.eth.get_logs({
+            "address": CONFIGURATOR,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": topics_filter,
+        })
+    except Exception as e:
+        if span <= 1 or not _is_range_error(e):
+            raise
+        current_span = max(MIN_BLOCK_SPAN, min(current_span, span) // 2)
+        _span_streak = 0
+        log.info("[SPAN] %s..%s rejected (%s); bisecting, span=%s", from_block, to_block, e, current_span)
+        mid = (from_block + to_block) // 2
+        return await get_logs_adaptive(from_block, mid) + await get_logs_adaptive(mid + 1, to_block)
+
+    if span >= current_span and len(logs) < SPAN_GROW_MAX_LOGS:
+        _span_streak += 1
+        if _span_streak >= SPAN_GROW_AFTER and current_span < MAX_BLOCK_SPAN:
+            current_span = min(MAX_BLOCK_SPAN, current_span * 2)
+            _span_streak = 0
+            log.info("[SPAN] growing span to %s", current_span)
+    elif len(logs) >= SPAN_GROW_MAX_LOGS:
+        _span_streak = 0
+    return logs
+
+async def process_range(from_block: int, to_block: int):
+    """
+    Process [from_block, to_block] in current_span windows, yielding each finished window_end.
+    Pipelined: get_logs for window N+1 is already in flight while window N is
+    timestamped / labelled (batch + Multicall3) and emitted.
+    """
+    if to_block < from_block:
+        return
+
+    start, end = from_block, min(from_block + current_span - 1, to_block)
+    nxt = asyncio.create_task(get_logs_adaptive(start, end))
+    try:
+        while nxt is not None:
+            logs = await nxt
+            win_start, win_end = start, end
+            nxt = None
+            if win_end < to_block:
+                start, end = win_end + 1, min(win_end + current_span, to_block)
+                nxt = asyncio.create_task(get_logs_adaptive(start, end))
+            await process_logs(logs, win_start, win_end)
+            yield win_end
+    finally:
+        if nxt is not None:
+            nxt.cancel()
+
+async def process_logs(logs, from_block: int, to_block: int) -> int:
+    """Decode + emit already-fetched cap-change logs. Returns number of logs processed."""
+    if not logs:
+        return 0
+    ts_by_block, _ = await asyncio.gather(
+        get_block_timestamps(lg["blockNumber"] for lg in logs),
+        prefetch_token_labels(log_asset_addr(lg) for lg in logs),
+    )
 
     count = 0
     for lg in logs:
         try:
-            ev = decode_cap_change_log(lg)
-            emit_event_msg(ev)
+            ev = await decode_cap_change_log(lg, ts_by_block)
+            await emit_event_msg(ev)
             count += 1
         except Exception:
             print("[ERR] failed to decode/process a log:")
             log.error("Failed to decode/process a log:", exc_info=True)
             traceback.print_exc()
+    await asyncio.to_thread(save_label_cache)
     if count:
         print(f"[INFO] Processed {count} cap-change logs in blocks {from_block}..{to_block}")
         log.info("[INFO] Processed %s cap-change logs in blocks %s..%s", count, from_block, to_block)
@@ -216,69 +386,173 @@ def fetch_and_process(from_block: int, to_block: int) -> int:
 # -------------------------
 # Stop-aware sleep helper
 # -------------------------
-def stop_aware_sleep(stop_event, secs: int) -> bool:
-    """Sleep up to secs, but exit early if stop_event is set. Returns True if stopped."""
-    for _ in range(secs):
-        if stop_event.is_set():
-            return True
-        time.sleep(1)
-    return False
-
-# -------------------------
-# Exported long-running loop
-# -------------------------
-def run_forever(stop_event):
+def _bridge_stop_event(stop_event) -> asyncio.Event:
     """
-    Long-running loop suitable for a background thread (Render Web Service).
-    - Resumes from DB cursor_state.last_block if DATABASE_URL set; else uses START_BLOCK_ENV or head-CONFIRMATIONS
-    - Processes logs in <= MAX_BLOCK_SPAN chunks
-    - Saves last processed block to DB when available
+    Mirror the service's threading.Event into an asyncio.Event on the running loop, via ONE
+    waiter thread for the whole run (no executor threads parked per sleep / reconnect).
     """
-    # DB connectivity sanity (optional)
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
 
+    def _wait():
+        stop_event.wait()
+        try:
+            loop.call_soon_threadsafe(stopped.set)
+        except RuntimeError:
+            pass  # loop already closed (watcher exited on its own)
 
-    log.info("chainId=%s head=%s CONFIGURATOR=%s", w3.eth.chain_id, w3.eth.block_number, CONFIGURATOR)
-    log.info("Topics: SUPPLY=%s | BORROW=%s", TOPIC_SUPPLY_CAP_CHANGED, TOPIC_BORROW_CAP_CHANGED)
-
-    head = w3.eth.block_number
-    # Preference: DB -> env -> safe head
-    last_processed = None
-    if last_processed is None:
-        if START_BLOCK_ENV:
-            try:
-                last_processed = int(START_BLOCK_ENV)
-            except ValueError:
-                last_processed = max(0, head - max(CONFIRMATIONS, 1))
-        else:
-            last_processed = max(0, head - CONFIRMATIONS)
+    threading.Thread(target=_wait, name="aave-stop-bridge", daemon=True).start()
+    return stopped
 
-    log.info("[START] last_processed set to %s", last_processed)
+async def stop_aware_sleep(stop_event: asyncio.Event, secs: int) -> bool:
+    """Sleep up to secs, but exit early if stop_event is set. Returns True if stopped."""
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=secs)
+        return True
+    except asyncio.TimeoutError:
+        return False
 
+# -------------------------
+# Polling loop (HTTP fallback)
+# -------------------------
+async def run_polling(stop_event, last_processed: int):
+    """Poll head every POLL_SECONDS and get_logs in <= current_span windows."""
     backoff = 1
     while not stop_event.is_set():
         try:
-            head = w3.eth.block_number
+            head = await w3.eth.block_number
             safe_head = max(0, head - CONFIRMATIONS)
 
             if safe_head < last_processed:
-                if stop_aware_sleep(stop_event, POLL_SECONDS): break
+                if await stop_aware_sleep(stop_event, POLL_SECONDS): break
                 continue
 
-            while last_processed <= safe_head:
-                window_end = min(last_processed + MAX_BLOCK_SPAN - 1, safe_head)
-                fetch_and_process(last_processed, window_end)
+            async for window_end in process_range(last_processed, safe_head):
                 last_processed = window_end + 1
 
 
             backoff = 1
-            if stop_aware_sleep(stop_event, POLL_SECONDS): break
+            if await stop_aware_sleep(stop_event, POLL_SECONDS): break
 
         except Exception as e:
             log.exception("[LOOP-ERR] %r", e)
-            notify(f"AAVE watcher error: {e!r}")
-            if stop_aware_sleep(stop_event, min(60, backoff)): break
+            await asyncio.to_thread(notify, f"AAVE watcher error: {e!r}")
+            if await stop_aware_sleep(stop_event, min(60, backoff)): break
             backoff = min(60, backoff * 2)
 
+# -------------------------
+# WebSocket push loop (eth_subscribe)
+# -------------------------
+async def _watch_stop(stop_event: asyncio.Event, aw3):
+    """Close the socket once stop_event is set so process_subscriptions() unblocks."""
+    await stop_event.wait()  # plain asyncio wait: cancelling on reconnect frees nothing but the task
+    await aw3.provider.disconnect()
+
+async def run_ws(stop_event, last_processed: int):
+    """
+    Push-based loop: eth_subscribe to cap-change logs + newHeads.
+    - Logs are buffered until CONFIRMATIONS blocks sit on top of them (newHeads drives this)
+    - removed=True logs (reorged out) are dropped from the buffer
+    - Blocks up to sub_head (the head right after subscribing) may predate the subscription,
+      so they always go through the HTTP get_logs path, never the push buffer; this also
+      re-covers anything buffered by a connection that dropped
+    - Reconnects with exponential backoff (capped at 60s)
+    """
+    backoff = 1
+    while not stop_event.is_set():
+        stopper = None
+        try:
+            async with AsyncWeb3(WebSocketProvider(ALCHEMY_WSS_URL)) as aw3:
+                stopper = asyncio.create_task(_watch_stop(stop_event, aw3))
+                logs_sub  = await aw3.eth.subscribe("logs", {"address": CONFIGURATOR, "topics": WATCH_TOPICS})
+                heads_sub = await aw3.eth.subscribe("newHeads")
+                log.info("[WS] subscribed logs=%s newHeads=%s", logs_sub, heads_sub)
+
+                # Only logs from blocks above sub_head are guaranteed to be pushed; everything up
+                # to it is fetched over HTTP (now up to the safe head, the rest as heads confirm it)
+                sub_head  = await w3.eth.block_number
+                safe_head = max(0, sub_head - CONFIRMATIONS)
+                async for window_end in process_range(last_processed, safe_head):
+                    last_processed = window_end + 1
+                backoff = 1
+
+                pending = []
+                async for payload in aw3.socket.process_subscriptions():
+                    if stop_event.is_set():
+                        break
+                    sub, result = payload["subscription"], payload["result"]
+
+                    if sub == logs_sub:
+                        key = (result["transactionHash"], result["logIndex"])
+                        if result.get("removed"):
+                            pending = [lg for lg in pending if (lg["transactionHash"], lg["logIndex"]) != key]
+                        elif result["blockNumber"] > sub_head:
+                            pending.append(result)
+
+                    elif sub == heads_sub:
+                        safe_head = max(0, result["number"] - CONFIRMATIONS)
+                        if safe_head < last_processed:
+                            continue
+                        if last_processed <= sub_head:
+                            async for window_end in process_range(last_processed, min(safe_head, sub_head)):
+                                last_processed = window_end + 1
+                            if safe_head <= sub_head:
+                                continue
+                        ready   = [lg for lg in pending if lg["blockNumber"] <= safe_head]
+                        pending = [lg for lg in pending if lg["blockNumber"] > safe_head]
+                        await process_logs(ready, last_processed, safe_head)
+                        last_processed = safe_head + 1
+
+        except ConnectionClosed as e:
+            if stop_event.is_set():
+                break
+            log.warning("[WS] connection closed (%r); reconnecting in %ss", e, backoff)
+        except Exception as e:
+            if stop_event.is_set():
+                break
+            log.exception("[WS-ERR] %r", e)
+            await asyncio.to_thread(notify, f"AAVE watcher WS error: {e!r}")
+        finally:
+            if stopper:
+                stopper.cancel()
+
+        if await stop_aware_sleep(stop_event, min(60, backoff)): break
+        backoff = min(60, backoff * 2)
+
+# -------------------------
+# Exported long-running loop
+# -------------------------
+async def _main(stop_event):
+    stop = _bridge_stop_event(stop_event)  # the loops below wait on the asyncio side
+    log.info("chainId=%s head=%s CONFIGURATOR=%s", await w3.eth.chain_id, await w3.eth.block_number, CONFIGURATOR)
+    log.info("Topics: SUPPLY=%s | BORROW=%s", TOPIC_SUPPLY_CAP_CHANGED, TOPIC_BORROW_CAP_CHANGED)
+    load_label_cache()
+
+    head = await w3.eth.block_number
+    # Preference: env -> safe head
+    if START_BLOCK_ENV:
+        try:
+            last_processed = int(START_BLOCK_ENV)
+        except ValueError:
+            last_processed = max(0, head - max(CONFIRMATIONS, 1))
+    else:
+        last_processed = max(0, head - CONFIRMATIONS)
+
+    log.info("[START] last_processed set to %s (mode=%s)", last_processed, "ws" if USE_WS else "polling")
+
+    if USE_WS:
+        await run_ws(stop, last_processed)
+    else:
+        await run_polling(stop, last_processed)
+
+def run_forever(stop_event):
+    """
+    Long-running loop suitable for a background thread (Render Web Service).
+    Runs the AsyncWeb3 watcher on its own event loop until stop_event is set.
+    - Resumes from START_BLOCK_ENV or head-CONFIRMATIONS
+    - USE_WS=1: eth_subscribe push (logs + newHeads); otherwise polls in adaptive (current_span) chunks
+    """
+    asyncio.run(_main(stop_event))
     log.info("AAVE watcher stopping gracefully.")
 
 
@@ -1,21 +1,32 @@
 import os
-import requests
+import asyncio
+import aiohttp
 import time
 import json
-import pandas as pd
+import hashlib
+import csv
+from dataclasses import dataclass, field
 from datetime import datetime, UTC
 from pathlib import Path
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, table, column, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 
+try:
+    import orjson  # fast path for (de)serializing the multi-MB assets payload
+except ImportError:
+    orjson = None
+
 # === CONFIG ===
 API_URL   = "https://api-v2.pendle.finance/core/v1/assets/all"
-PARAMS    = {"chainId": 1}  # Ethereum mainnet
 
 load_dotenv()
+# Chains polled every cycle (concurrently); PENDLE_CHAIN_IDS="1,42161,56" → Ethereum, Arbitrum, BSC
+CHAINS        = [int(c) for c in (os.getenv("PENDLE_CHAIN_IDS") or "1").split(",") if c.strip()]
+MULTI_CHAIN   = len(CHAINS) > 1  # single chain keeps the original address-keyed table and file names
 BOT_TOKEN     = os.getenv("BOT_TOKEN")
 CHAT_ID       = os.getenv("CHAT_ID")
 DATABASE_URL  = os.getenv("DATABASE_URL")  # required for DB
@@ -23,200 +34,498 @@ DATABASE_URL  = os.getenv("DATABASE_URL")  # required for DB
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL not set; please set it in Render env vars")
 
-# Local folder mainly for snapshots (nice to keep)
-BASE_DIR = Path(__file__).resolve().parent
+# Local folder mainly for snapshots (nice to keep); PENDLE_BASE_DIR overrides for local/dev machines
+BASE_DIR = Path(os.getenv("PENDLE_BASE_DIR") or Path(__file__).resolve().parent)
 SNAP_DIR = BASE_DIR / "pendle_snapshots"
 SNAP_DIR.mkdir(parents=True, exist_ok=True)
 
 POLL_SECS = 15 * 60  # 15 minutes between checks
+SNAP_KEEP = 30       # newest compressed snapshots kept in SNAP_DIR
+FULL_UPSERT_SECS = 60 * 60  # refresh last_seen_ts for ALL assets at most hourly
 
 # Logging
 log = logging.getLogger("pendle_watcher")
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s %(levelname)s %(name)s - %(message)s")
 
+def _sqlalchemy_url(url: str) -> str:
+    """
+    Render hands out postgres:// URLs, which SQLAlchemy maps to psycopg2; pin the
+    psycopg 3 driver from requirements.txt instead (explicit +driver URLs are kept).
+    """
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
 # Single shared engine
-_engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+_engine = create_engine(_sqlalchemy_url(DATABASE_URL), pool_pre_ping=True)
+
+# Shared keep-alive aiohttp session (Pendle API + Telegram), created on the running loop;
+# every chain hits the same API host, so the per-host cap bounds the concurrent chain GETs
+_http: aiohttp.ClientSession | None = None
+
+HTTP_RETRY_STATUSES = {429, 500, 502, 503, 504}  # retried with backoff on the Pendle GET
+HTTP_RETRIES        = 3  # also applies to connect / read errors and timeouts
+
+def _get_http() -> aiohttp.ClientSession:
+    global _http
+    if _http is None or _http.closed:
+        _http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=10, limit_per_host=8, keepalive_timeout=300),
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    return _http
+
+async def close_http():
+    global _http
+    if _http is not None and not _http.closed:
+        await _http.close()
+    _http = None
+
+TG_MAX_CHARS = 4000  # Telegram rejects sendMessage text over 4096 chars
+
+def _chunk_message(msg: str, limit: int = TG_MAX_CHARS) -> list[str]:
+    """Split msg on line boundaries into <= limit-char chunks (over-long lines are hard-split)."""
+    chunks, cur = [], ""
+    for line in msg.split("\n"):
+        for i in range(0, max(len(line), 1), limit):
+            piece = line[i:i + limit]
+            if cur and len(cur) + 1 + len(piece) > limit:
+                chunks.append(cur)
+                cur = piece
+            else:
+                cur = f"{cur}\n{piece}" if cur else piece
+    if cur:
+        chunks.append(cur)
+    return chunks
 
-def notify(msg: str):
-    """Send Telegram message if BOT_TOKEN + CHAT_ID available, else just log."""
+async def notify(msg: str):
+    """Send Telegram message if BOT_TOKEN + CHAT_ID available, else just log. Long messages go out in chunks."""
     if not (BOT_TOKEN and CHAT_ID):
         log.info(msg)
         return
     try:
-        requests.post(
-            f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
-            data={"chat_id": CHAT_ID, "text": msg},
-            timeout=10,
-        )
+        for chunk in _chunk_message(msg):
+            async with _get_http().post(
+                f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
+                data={"chat_id": CHAT_ID, "text": chunk},
+                timeout=aiohttp.ClientTimeout(total=10),
+            ) as r:
+                await r.read()
     except Exception as e:
         log.warning("[ERR][TELEGRAM] %s", e)
 
-def fetch_assets():
-    r = requests.get(API_URL, params=PARAMS, timeout=30)
-    r.raise_for_status()
-    return r.json()  # expects {"assets": [...]}
+@dataclass
+class ChainState:
+    """Per-chain watcher state (one per entry in CHAINS), kept across cycles."""
+    chain_id: int
+    # Validators of the last FULLY PROCESSED response (committed by process_chain via
+    # mark_processed, so a cycle that fails midway is re-done next time instead of being
+    # answered with a 304): ETag / Last-Modified go back to the server, the body SHA-256
+    # catches unchanged lists when the server sends no validators.
+    etag: str | None = None
+    last_modified: str | None = None
+    body_digest: bytes | None = None
+    # Addresses known to be in the DB: seeded on the first cycle, then extended by each cycle.
+    # None → not seeded yet (or seeding failed: every asset becomes an INSERT candidate and
+    # RETURNING sorts it out).
+    known_addrs: set[str] | None = None
+    # monotonic time of the last full-list upsert; None → next cycle does one
+    last_full_upsert_ts: float | None = None
+    # addresses in the last processed payload (heartbeat target while the list is unchanged)
+    listed_addrs: list[str] = field(default_factory=list)
+    # Content hash of the assets in the last snapshot written; identical payloads are not rewritten
+    last_snapshot_hash: bytes | None = None
+    # Set every 96th cycle, cleared once a payload has been snapshotted (a failed cycle retries)
+    snapshot_due: bool = False
+
+async def fetch_assets(st: ChainState, conditional: bool = True):
+    """
+    GET the asset list of one chain. Returns (payload, validators); payload is None when the
+    list is unchanged since the last processed response (304, or byte-identical body → not parsed).
+    conditional=False sends no validators and always parses (snapshot cycles need the payload).
+    """
+    headers = {}
+    if conditional and st.etag:
+        headers["If-None-Match"] = st.etag
+    if conditional and st.last_modified:
+        headers["If-Modified-Since"] = st.last_modified
+
+    for attempt in range(HTTP_RETRIES + 1):
+        last_try = attempt == HTTP_RETRIES
+        try:
+            async with _get_http().get(API_URL, params={"chainId": st.chain_id}, headers=headers) as r:
+                if r.status == 304:
+                    return None, None
+                if r.status not in HTTP_RETRY_STATUSES or last_try:
+                    r.raise_for_status()
+                    body = await r.read()
+                    validators = (r.headers.get("ETag"), r.headers.get("Last-Modified"), hashlib.sha256(body).digest())
+                    break
+        except aiohttp.ClientResponseError:
+            raise  # non-retryable status (or retries used up)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if last_try:
+                raise
+        # retryable status / connect or read failure: the response is released by now,
+        # so the pooled connection isn't held through the backoff
+        await asyncio.sleep(2 ** attempt)
+
+    if conditional and validators[2] == st.body_digest:
+        return None, validators
+    # expects {"assets": [...]}; orjson parses the raw bytes, no intermediate str decode
+    if orjson is not None:
+        return orjson.loads(body), validators
+    return json.loads(body), validators
+
+def mark_processed(st: ChainState, validators):
+    if validators is not None:
+        st.etag, st.last_modified, st.body_digest = validators
+
+def _dumps(obj) -> bytes:
+    """Compact JSON bytes (orjson if available) — used for hashing and snapshots."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 def atomic_save(path: Path, payload: dict):
-    """Write safely so a crash never leaves a corrupt file."""
+    """Write compact JSON through a zstd stream, safely so a crash never leaves a corrupt file."""
+    import zstandard as zstd  # lazy: only snapshot cycles (1 in 96) need it
+
     tmp = path.with_suffix(path.suffix + ".tmp")
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    cctx = zstd.ZstdCompressor(level=10)
+    with open(tmp, "wb") as f, cctx.stream_writer(f) as w:
+        w.write(_dumps(payload))
     tmp.replace(path)
 
-def snapshot_payload(payload):
+def snapshot_payload(payload, chain_id: int):
     ts = datetime.now(UTC).strftime("%Y%m%d-%H%M%S")
-    snap_fp = SNAP_DIR / f"assets_{ts}.json"
+    suffix = f"_c{chain_id}" if MULTI_CHAIN else ""
+    snap_fp = SNAP_DIR / f"assets_{ts}{suffix}.json.zst"
     atomic_save(snap_fp, payload)
+
+    # rotate per chain: timestamped names sort chronologically → drop all but the newest SNAP_KEEP
+    for old_fp in sorted(SNAP_DIR.glob(f"assets_*{suffix}.json.zst"))[:-SNAP_KEEP]:
+        old_fp.unlink(missing_ok=True)
     return snap_fp
 
 # ==== DB helpers ====
-UPSERT_SQL = text("""
-    INSERT INTO pendle_assets(address, name, symbol, chain_id)
-    VALUES (:address, :name, :symbol, :chain_id)
-    ON CONFLICT (address) DO UPDATE
-    SET name = EXCLUDED.name,
-        symbol = EXCLUDED.symbol,
-        chain_id = EXCLUDED.chain_id,
-        last_seen_ts = now()
+PENDLE_ASSETS = table(
+    "pendle_assets",
+    column("address"), column("name"), column("symbol"), column("chain_id"), column("last_seen_ts"),
+)
+
+# Multi-row statements bind 4 params per row; Postgres caps a statement at 65535 binds,
+# so big batches go out in pages (20k binds each) inside ONE transaction.
+DB_PAGE_ROWS = 5000
+
+# Conflict key of pendle_assets. A single chain keeps the original address primary key; with
+# several chains the same address can be listed on more than one of them, so the table must
+# be keyed on (chain_id, address) instead (checked at startup by check_asset_key; run
+# migrations/pendle_assets_chain_key.sql once before listing a second chain in PENDLE_CHAIN_IDS).
+ASSET_KEY = ["chain_id", "address"] if MULTI_CHAIN else ["address"]
+
+UNIQUE_KEYS_SQL = text("""
+    SELECT array_agg(a.attname::text ORDER BY a.attname)
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+    WHERE i.indrelid = 'pendle_assets'::regclass AND i.indisunique
+    GROUP BY i.indexrelid
 """)
 
-def get_known_addresses() -> set[str]:
+def check_asset_key() -> bool:
+    """
+    Multi-chain mode only: True if pendle_assets has a unique (chain_id, address) key and no
+    unique key on address alone (which would still merge the same address across chains).
+    """
+    if not MULTI_CHAIN:
+        return True
+    with _engine.connect() as con:
+        keys = {tuple(row[0]) for row in con.execute(UNIQUE_KEYS_SQL)}
+    return ("address", "chain_id") in keys and ("address",) not in keys
+
+def _pages(rows: list[dict]):
+    for i in range(0, len(rows), DB_PAGE_ROWS):
+        yield rows[i:i + DB_PAGE_ROWS]
+
+def upsert_stmt(rows: list[dict]):
     """
-    Return the set of lowercased addresses already present in pendle_assets.
-    If table is empty, returns empty set.
+    ONE multi-row INSERT ... VALUES (..),(..) ON CONFLICT (ASSET_KEY) DO UPDATE for all rows,
+    i.e. a single round trip instead of one INSERT per row. The DO UPDATE only fires for rows
+    whose metadata actually changed, so this statement skips unchanged rows (their hourly
+    last_seen_ts bump is TOUCH_SQL's job and still writes a new row version).
+    With several chains chain_id is part of the key, not metadata, so it is never rewritten.
     """
+    ins = pg_insert(PENDLE_ASSETS).values(rows)
+    cur, new = PENDLE_ASSETS.c, ins.excluded
+    cols = ["name", "symbol"] if MULTI_CHAIN else ["name", "symbol", "chain_id"]
+    return ins.on_conflict_do_update(
+        index_elements=ASSET_KEY,
+        set_={c: new[c] for c in cols},
+        where=or_(*(cur[c].is_distinct_from(new[c]) for c in cols)),
+    )
+
+# Liveness bump for every asset still listed on one chain: one plain UPDATE with an address array
+# (the chain filter only applies with several chains; text() ignores the unused :chain_id otherwise)
+_CHAIN_FILTER = "chain_id = :chain_id AND " if MULTI_CHAIN else ""
+TOUCH_SQL = text(f"UPDATE pendle_assets SET last_seen_ts = now() WHERE {_CHAIN_FILTER}address = ANY(:addrs)")
+
+def touch_assets(chain_id: int, addrs: list[str]) -> bool:
+    """last_seen_ts heartbeat only (list unchanged → metadata unchanged). Returns True on success."""
     try:
         with _engine.begin() as con:
-            rows = con.execute(text("SELECT address FROM pendle_assets"))
-            return { (row[0] or "").lower() for row in rows }
+            con.execute(TOUCH_SQL, {"chain_id": chain_id, "addrs": addrs})
+        return True
     except SQLAlchemyError as e:
-        log.warning("[WARN][DB] Could not fetch known addresses: %s", e)
-        return set()
+        log.error("[ERR][DB] last_seen_ts update failed: %s", e)
+        return False
 
-def upsert_asset_batch(assets: list[dict]):
-    """Upsert all current assets so last_seen_ts stays fresh."""
-    rows = []
+def asset_rows(assets: list[dict], chain_id: int) -> dict[str, dict]:
+    """
+    Normalize API assets into pendle_assets rows keyed by lowercased address, in ONE pass
+    (duplicates: last wins — one statement can't touch the same row twice). Address-less
+    assets are dropped. The DB helpers and CSV log all take these rows as-is.
+    """
+    rows = {}
     for a in assets:
-        rows.append({
-            "address": (a.get("address") or "").lower(),
+        addr = (a.get("address") or "").lower()
+        if not addr:
+            continue
+        rows[addr] = {
+            "address": addr,
             "name": a.get("name") or a.get("symbol") or "",
             "symbol": a.get("symbol") or "",
-            "chain_id": a.get("chainId") or a.get("chain_id") or PARAMS["chainId"],
-        })
+            "chain_id": a.get("chainId") or a.get("chain_id") or chain_id,
+        }
+    return rows
+
+KNOWN_SQL = text(f"SELECT address FROM pendle_assets WHERE {_CHAIN_FILTER}address = ANY(:addrs)")
+
+def load_known_addresses(chain_id: int, addrs: list[str]) -> set[str] | None:
+    """
+    Seed for a chain's in-memory known set: which of addrs are already in pendle_assets for
+    that chain. Key lookups bounded by the payload size, not the table size (None on DB error).
+    """
+    params = {"chain_id": chain_id, "addrs": addrs}
+    try:
+        with _engine.connect() as con:
+            return {(row[0] or "").lower() for row in con.execute(KNOWN_SQL, params)}
+    except SQLAlchemyError as e:
+        log.warning("[WARN][DB] Could not load known addresses: %s", e)
+        return None
+
+def insert_new_assets(rows: list[dict]) -> list[str] | None:
+    """
+    INSERT ... ON CONFLICT (ASSET_KEY) DO NOTHING RETURNING address, one round trip per page:
+    Postgres itself reports which addresses were actually new (existing rows are untouched).
+    Returns the new addresses, or None if the DB call failed.
+    """
     if not rows:
-        return
+        return []
+    try:
+        inserted = []
+        with _engine.begin() as con:
+            for page in _pages(rows):
+                stmt = (
+                    pg_insert(PENDLE_ASSETS).values(page)
+                    .on_conflict_do_nothing(index_elements=ASSET_KEY)
+                    .returning(PENDLE_ASSETS.c.address)
+                )
+                inserted.extend(row[0] for row in con.execute(stmt))
+        return inserted
+    except SQLAlchemyError as e:
+        log.error("[ERR][DB] Insert of new assets failed: %s", e)
+        return None
+
+def upsert_asset_batch(chain_id: int, rows: list[dict]) -> bool:
+    """
+    Refresh one chain's asset rows in one transaction: upsert metadata (written only where it
+    changed), then bump last_seen_ts for all of them. Returns True on success.
+    """
+    if not rows:
+        return True
     try:
         with _engine.begin() as con:
-            con.execute(UPSERT_SQL, rows)
+            for page in _pages(rows):
+                con.execute(upsert_stmt(page))
+            con.execute(TOUCH_SQL, {"chain_id": chain_id, "addrs": [r["address"] for r in rows]})
+        return True
     except SQLAlchemyError as e:
         log.error("[ERR][DB] Upsert failed: %s", e)
+        return False
 
-def append_log_csv(new_assets: list[dict], log_fp: Path):
+CSV_FIELDS = ["ts", "address", "name", "symbol", "chain_id"]
+
+def append_log_csv(new_rows: list[dict], log_fp: Path):
     """Optional: append-only CSV of just the NEW assets discovered in this cycle."""
-    if not new_assets:
+    if not new_rows:
         return
     try:
-        df = pd.DataFrame([{
-            "ts": datetime.now(UTC).isoformat(timespec="seconds"),
-            "address": (a.get("address") or "").lower(),
-            "name": a.get("name") or a.get("symbol") or "",
-            "symbol": a.get("symbol") or "",
-            "chain_id": a.get("chainId") or a.get("chain_id") or PARAMS["chainId"],
-        } for a in new_assets])
+        ts = datetime.now(UTC).isoformat(timespec="seconds")
         header = not log_fp.exists()
-        df.to_csv(log_fp, mode="a", header=header, index=False, encoding="utf-8")
+        with open(log_fp, "a", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if header:
+                w.writeheader()
+            w.writerows({"ts": ts, **row} for row in new_rows)
     except Exception as e:
         log.warning("[WARN] Could not append CSV log: %s", e)
 
 LOG_FP = BASE_DIR / "pendle_new_assets_log.csv"
 
-def one_cycle(cycle_idx: int):
-    # 0) ensure DB reachable
-    try:
-        with _engine.connect() as con:
-            con.execute(text("SELECT 1"))
-    except SQLAlchemyError as e:
-        log.error("DB connection check failed: %s", e)
-        return
+_chain_states = {c: ChainState(c) for c in CHAINS}
+
+async def process_chain(st: ChainState, cycle_idx: int):
+    # DB calls are sync SQLAlchemy → run in a worker thread so the loop stays free.
+    # No per-cycle SELECT 1: pool_pre_ping already probes on checkout, and the DB helpers
+    # below log + bail out on SQLAlchemyError.
 
-    # 1) fetch current payload
-    payload = fetch_assets()
+    # 1) fetch current payload (None → 304 / identical body: skip parse, diff, notify;
+    #    only the hourly last_seen_ts heartbeat still runs). A due snapshot needs the payload,
+    #    so that fetch is unconditional.
+    if cycle_idx % 96 == 0:
+        st.snapshot_due = True
+    payload, validators = await fetch_assets(st, conditional=not st.snapshot_due)
+    ts = datetime.now(UTC).isoformat(timespec="seconds")
+    now = time.monotonic()
+    full_upsert = st.last_full_upsert_ts is None or now - st.last_full_upsert_ts >= FULL_UPSERT_SECS
+    if payload is None:
+        log.info("[%s] chain %s: assets unchanged (304 / same content).", ts, st.chain_id)
+        if full_upsert and st.listed_addrs and await asyncio.to_thread(touch_assets, st.chain_id, st.listed_addrs):
+            st.last_full_upsert_ts = now
+        mark_processed(st, validators)
+        return
     curr_assets = payload.get("assets", [])
 
-    # 2) DB-based "already known" addresses
-    known_addrs = get_known_addresses()
-    bootstrap = len(known_addrs) == 0
+    # 2) occasional snapshot (skipped when assets are byte-identical to the last one)
+    if st.snapshot_due:
+        h = hashlib.blake2b(_dumps(curr_assets), digest_size=16).digest()
+        if h == st.last_snapshot_hash:
+            log.info("[%s] chain %s: snapshot skipped (assets unchanged).", ts, st.chain_id)
+        else:
+            snap_fp = await asyncio.to_thread(snapshot_payload, payload, st.chain_id)
+            st.last_snapshot_hash = h
+            log.info("[%s] chain %s: snapshot saved → %s", ts, st.chain_id, snap_fp)
+        st.snapshot_due = False
 
-    # 3) detect "new" vs DB
-    new_assets = []
-    for a in curr_assets:
-        addr = (a.get("address") or "").lower()
-        if addr and addr not in known_addrs:
-            new_assets.append(a)
+    # 3) normalize once (reused for insert, upsert, notify, CSV), then drop the raw API dicts
+    #    so they aren't held in memory across the DB / Telegram round trips below
+    by_addr = asset_rows(curr_assets, st.chain_id)
+    del payload, curr_assets
 
-    # 4) upsert everything into DB
-    upsert_asset_batch(curr_assets)
+    # 4) candidates: addresses not in the in-memory known set (seeded once per process,
+    #    only for the addresses in the payload)
+    if st.known_addrs is None:
+        st.known_addrs = await asyncio.to_thread(load_known_addresses, st.chain_id, list(by_addr))
+        if st.known_addrs is not None:
+            log.info("chain %s: seeded %s known addresses from DB.", st.chain_id, len(st.known_addrs))
+    known_addrs = st.known_addrs or set()
+    candidates  = [by_addr[addr] for addr in by_addr.keys() - known_addrs]
 
-    # 5) notify/report
-    ts = datetime.now(UTC).isoformat(timespec="seconds")
-    if new_assets and not bootstrap:
-        names = [a.get("name") or a.get("symbol") or "?" for a in new_assets]
-        msg = "Pendle watcher: " + str(len(new_assets)) + " new assets detected:\n" + "\n".join(names)
-        notify(msg)
-        append_log_csv(new_assets, LOG_FP)
-        log.info("[%s] Found %s new assets (DB-based).", ts, len(new_assets))
+    # 5) the DB decides what's new: INSERT ... ON CONFLICT DO NOTHING RETURNING address
+    inserted = await asyncio.to_thread(insert_new_assets, candidates)
+    if inserted is None:
+        return  # DB unavailable → retry the same candidates next cycle
+    new_rows   = [by_addr[addr] for addr in inserted]
+    bootstrap  = not known_addrs and bool(by_addr) and len(inserted) == len(by_addr)  # table was empty
+    st.known_addrs = known_addrs | by_addr.keys()
+
+    # 6) full-list upsert (last_seen_ts heartbeat) every FULL_UPSERT_SECS, as a task
+    #    so it overlaps with notify below
+    upsert_task = asyncio.create_task(asyncio.to_thread(upsert_asset_batch, st.chain_id, list(by_addr.values()))) if full_upsert else None
+
+    # 7) notify/report
+    if new_rows and not bootstrap:
+        names = [r["name"] or "?" for r in new_rows]
+        msg = f"Pendle watcher: {len(new_rows)} new assets detected on chain {st.chain_id}:\n" + "\n".join(names)
+        await notify(msg)
+        append_log_csv(new_rows, LOG_FP)
+        log.info("[%s] chain %s: found %s new assets (DB-based).", ts, st.chain_id, len(new_rows))
     elif bootstrap:
-        log.info("[%s] Bootstrap run: %s assets loaded into DB (no Telegram).", ts, len(curr_assets))
+        log.info("[%s] chain %s: bootstrap run, %s assets loaded into DB (no Telegram).", ts, st.chain_id, len(by_addr))
     else:
-        log.info("[%s] No new assets (DB-based).", ts)
+        log.info("[%s] chain %s: no new assets (DB-based).", ts, st.chain_id)
 
-    # 6) occasional snapshot
-    if cycle_idx % 96 == 0:
-        snap_fp = snapshot_payload(payload)
-        log.info("[%s] Snapshot saved → %s", ts, snap_fp)
+    if upsert_task is not None and await upsert_task:
+        st.last_full_upsert_ts = now
+
+    st.listed_addrs = list(by_addr)
+    mark_processed(st, validators)
+
+async def one_cycle(cycle_idx: int):
+    """
+    Poll every chain in CHAINS concurrently over the shared session. A failing chain is
+    logged and retried next cycle without holding up the others; only when ALL chains
+    fail is the first error raised (→ run_forever backs off). Cancellation is re-raised.
+    """
+    states = list(_chain_states.values())
+    results = await asyncio.gather(*(process_chain(st, cycle_idx) for st in states), return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException) and not isinstance(r, Exception):  # CancelledError & co.
+            raise r
+    errors = [(st, r) for st, r in zip(states, results) if isinstance(r, Exception)]
+    for st, e in errors:
+        log.warning("[WARN] chain %s failed this cycle: %r", st.chain_id, e)
+    if errors and len(errors) == len(states):
+        raise errors[0][1]
 
 # ---- stop-aware sleep helper ----
-def stop_aware_sleep(stop_event, secs: int) -> bool:
-    """Sleep up to secs, but exit early if stop_event is set. Returns True if stopped."""
-    for _ in range(secs):
-        if stop_event.is_set():
-            return True
-        time.sleep(1)
-    return False
-
-def run_forever(stop_event):
-    """Long-running loop for Render Web Service / Worker."""
+async def stop_aware_sleep(stop: asyncio.Event, secs: int) -> bool:
+    """Sleep up to secs, but exit early if stop is set. Returns True if stopped."""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=secs)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+def _db_ping():
+    with _engine.connect() as con:
+        con.execute(text("SELECT 1"))
+
+async def run_forever(stop: asyncio.Event):
+    """Long-running task for the Render Web Service's event loop (or standalone via asyncio.run)."""
     log.info("Starting Pendle asset watcher…")
 
     # Initial DB sanity check
     try:
-        with _engine.connect() as con:
-            con.execute(text("SELECT 1"))
+        await asyncio.to_thread(_db_ping)
         log.info("DB connected.")
     except SQLAlchemyError as e:
         log.error("DB connection failed at startup: %s", e)
 
+    # Multi-chain mode needs pendle_assets keyed on (chain_id, address) — see ASSET_KEY
+    try:
+        key_ok = await asyncio.to_thread(check_asset_key)
+    except SQLAlchemyError as e:
+        log.warning("[WARN][DB] Could not check the pendle_assets key: %s", e)
+        key_ok = True  # unverified; a wrong key surfaces as ON CONFLICT errors in the DB log
+    if not key_ok:
+        log.error("PENDLE_CHAIN_IDS lists %s chains, but pendle_assets is not keyed on "
+                  "(chain_id, address); refusing to start (run migrations/pendle_assets_chain_key.sql).", len(CHAINS))
+        return
+
     i = 0
-    while not stop_event.is_set():
-        try:
-            one_cycle(i)
-        except requests.HTTPError as e:
-            status = e.response.status_code if e.response is not None else "?"
-            log.warning("[WARN] HTTP error %s: %s. Backing off 5 minutes.", status, e)
-            if stop_aware_sleep(stop_event, 5 * 60):
-                break
-        except Exception as e:
-            log.error("[ERROR] %s. Backing off 5 minutes.", e, exc_info=True)
-            if stop_aware_sleep(stop_event, 5 * 60):
-                break
-        finally:
-            i += 1
-            if stop_aware_sleep(stop_event, POLL_SECS):
-                break
+    try:
+        while not stop.is_set():
+            try:
+                await one_cycle(i)
+            except aiohttp.ClientResponseError as e:
+                log.warning("[WARN] HTTP error %s: %s. Backing off 5 minutes.", e.status, e)
+                if await stop_aware_sleep(stop, 5 * 60):
+                    break
+            except Exception as e:
+                log.error("[ERROR] %s. Backing off 5 minutes.", e, exc_info=True)
+                if await stop_aware_sleep(stop, 5 * 60):
+                    break
+            finally:
+                i += 1
+                if await stop_aware_sleep(stop, POLL_SECS):
+                    break
+    finally:
+        await close_http()
 
     log.info("Pendle watcher stopping gracefully.")
 
 if __name__ == "__main__":
-    from threading import Event
-    run_forever(Event())
+    asyncio.run(run_forever(asyncio.Event()))
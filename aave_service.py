@@ -1,25 +1,20 @@
 import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from AAVEWatcher import run_forever
 
-app = FastAPI(title="AAVE Watcher Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = threading.Event()
+    thread = threading.Thread(target=run_forever, args=(stop,), daemon=True)
+    thread.start()
+    yield
+    stop.set()
+    if thread.is_alive():
+        thread.join(timeout=10)
 
-_stop = threading.Event()
-_thread = None
+app = FastAPI(title="AAVE Watcher Service", lifespan=lifespan)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
-
-@app.on_event("startup")
-def on_start():
-    global _thread
-    _stop.clear()
-    _thread = threading.Thread(target=run_forever, args=(_stop,), daemon=True)
-    _thread.start()
-
-@app.on_event("shutdown")
-def on_stop():
-    _stop.set()
-    if _thread and _thread.is_alive():
-        _thread.join(timeout=10)
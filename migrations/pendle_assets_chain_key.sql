@@ -0,0 +1,9 @@
+-- Re-key pendle_assets on (chain_id, address) so PendleAssetsWatcher can poll several chains
+-- (PENDLE_CHAIN_IDS="1,42161,..."). Not needed for the default single chain (PENDLE_CHAIN_IDS=1).
+-- Run once, before starting the watcher with more than one chain; it refuses to start otherwise.
+BEGIN;
+UPDATE pendle_assets SET chain_id = 1 WHERE chain_id IS NULL;
+ALTER TABLE pendle_assets
+    DROP CONSTRAINT pendle_assets_pkey,
+    ADD PRIMARY KEY (chain_id, address);
+COMMIT;
@@ -1,31 +1,50 @@
-import threading
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from PendleAssetsWatcher import run_forever
-from PendleAssetsWatcher import notify 
+from PendleAssetsWatcher import notify
 
-app = FastAPI(title="Pendle Watcher Service")
+log = logging.getLogger("pendle_service")
 
-_stop = threading.Event()
-_thread = None
+def _log_watcher_exit(task: asyncio.Task):
+    """Done-callback: surface a watcher that died (or returned) instead of losing it silently."""
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        log.error("Pendle watcher task crashed", exc_info=exc)
+    elif not app.state.stop.is_set():
+        log.error("Pendle watcher task exited before shutdown")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # watcher runs as a task on FastAPI's own event loop (no extra thread)
+    stop = asyncio.Event()
+    task = asyncio.create_task(run_forever(stop))
+    task.add_done_callback(_log_watcher_exit)
+    app.state.stop, app.state.watcher = stop, task
+    yield
+    stop.set()
+    if not task.done():
+        try:
+            await asyncio.wait_for(task, timeout=10)
+        except asyncio.TimeoutError:
+            log.warning("Pendle watcher did not stop within 10s; cancelled")  # wait_for cancelled it
+        except Exception:
+            pass  # already logged by _log_watcher_exit; don't fail the shutdown
+
+app = FastAPI(title="Pendle Watcher Service", lifespan=lifespan)
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    # 503 once the watcher task is gone, so the platform health check restarts the service
+    if app.state.watcher.done():
+        return JSONResponse({"status": "watcher stopped", "watcher_running": False}, status_code=503)
+    return {"status": "ok", "watcher_running": True}
 
 @app.get("/test-notify")
-def test_notify():
-    notify("Test message from Render")
+async def test_notify():
+    await notify("Test message from Render")
     return {"sent" : True}
-
-@app.on_event("startup")
-def on_start():
-    global _thread
-    _stop.clear()
-    _thread = threading.Thread(target=run_forever, args=(_stop,), daemon=True)
-    _thread.start()
-
-@app.on_event("shutdown")
-def on_stop():
-    _stop.set()
-    if _thread and _thread.is_alive():
-        _thread.join(timeout=10)
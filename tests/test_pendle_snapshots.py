@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+for _mod in ("aiohttp", "dotenv", "sqlalchemy", "psycopg", "zstandard"):
+    pytest.importorskip(_mod)
+
+# Import-time config: the engine is created but never connected in these tests
+os.environ.setdefault("DATABASE_URL", "postgresql://watcher@localhost/watcher")
+os.environ["PENDLE_BASE_DIR"] = tempfile.mkdtemp()
+
+import PendleAssetsWatcher as pw  # noqa: E402
+
+PAYLOAD = {"assets": [{"address": "0xAbC", "name": "PT-x", "symbol": "PT", "chainId": 1}]}
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    """
+    Fake Pendle API + DB: answers 304 to any request carrying validators, raises while
+    api["down"] is set, and records each fetch's `conditional` flag in api["calls"].
+    """
+    state = {"calls": [], "down": False}
+
+    async def fake_fetch(st, conditional=True):
+        state["calls"].append(conditional)
+        if state["down"]:
+            raise RuntimeError("API down")
+        if conditional and st.etag:
+            return None, None
+        return PAYLOAD, ('"v1"', None, b"digest")
+
+    monkeypatch.setattr(pw, "SNAP_DIR", tmp_path)
+    monkeypatch.setattr(pw, "fetch_assets", fake_fetch)
+    monkeypatch.setattr(pw, "load_known_addresses", lambda *a: {"0xabc"})
+    monkeypatch.setattr(pw, "insert_new_assets", lambda rows: [])
+    monkeypatch.setattr(pw, "upsert_asset_batch", lambda *a: True)
+    monkeypatch.setattr(pw, "touch_assets", lambda *a: True)
+    return state
+
+
+def snapshots(tmp_path):
+    return list(tmp_path.glob("assets_*.json.zst"))
+
+
+def test_snapshot_cycle_refetches_when_list_unchanged(api, tmp_path):
+    st = pw.ChainState(1)
+    asyncio.run(pw.process_chain(st, 1))   # full fetch, validators committed
+    asyncio.run(pw.process_chain(st, 2))   # 304
+    assert snapshots(tmp_path) == []
+
+    asyncio.run(pw.process_chain(st, 96))  # snapshot cycle: a conditional GET would be a 304
+    assert api["calls"] == [True, True, False]
+    assert len(snapshots(tmp_path)) == 1
+    assert not st.snapshot_due
+
+
+def test_snapshot_stays_due_after_failed_cycle(api, tmp_path):
+    st = pw.ChainState(1)
+    asyncio.run(pw.process_chain(st, 1))
+
+    api["down"] = True
+    with pytest.raises(RuntimeError):
+        asyncio.run(pw.process_chain(st, 96))
+    assert st.snapshot_due
+
+    api["down"] = False
+    asyncio.run(pw.process_chain(st, 97))  # next cycle takes the missed snapshot
+    assert api["calls"] == [True, False, False]
+    assert len(snapshots(tmp_path)) == 1